@@ -1,25 +1,42 @@
 from __future__ import annotations
+import io
 import os
 import sys
+import re
+import bisect
+import functools
+import importlib
+import importlib.util
 import argparse
 from typing import Literal, Optional
 
-import qrcode
-from qrcode.constants import ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q, ERROR_CORRECT_H
+# qrcode (and with it ElementTree and Pillow) is imported on first use by
+# _lazy_qrcode(), so --help/--version and GUI start-up stay fast.
+qrcode = None
+qr_fast = None
 
-# Pillow is optional (PNG); SVG needs no Pillow
-try:
-    from PIL import Image  # noqa: F401
-    _PIL_AVAILABLE = True
-except Exception:
-    _PIL_AVAILABLE = False
+# Pillow is optional (PNG preview in the GUI); looked up without importing it
+_PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
 
-# SVG factories (no Pillow required)
-try:
-    import qrcode.image.svg as qsvg
-    _SVG_AVAILABLE = True
-except Exception:
-    _SVG_AVAILABLE = False
+# SVG factories by method, filled in by _lazy_qrcode() (no Pillow required)
+_SVG_FACTORIES: dict[str, type] = {}
+
+
+def _lazy_qrcode():
+    """Import qrcode and install the qr_fast accelerators, once."""
+    global qrcode, qr_fast
+    if qr_fast is not None:
+        return
+    qrcode = importlib.import_module("qrcode")
+    importlib.import_module("qrcode.image.svg")  # for the SVG factories below
+    fast = importlib.import_module("qr_fast")
+    fast.install()
+    _SVG_FACTORIES.update(
+        basic=qrcode.image.svg.SvgImage,
+        fragment=qrcode.image.svg.SvgFragmentImage,
+        path=fast.FastSvgPathImage,  # best for zoom; no hairline gaps
+    )
+    qr_fast = fast
 
 
 ErrorLevel = Literal["L", "M", "Q", "H"]
@@ -30,82 +47,281 @@ SvgMethod = Literal["basic", "fragment", "path"]
 class QRCodeGenerator:
     """Reusable QR code generator for PNG and SVG."""
 
+    # qrcode.constants.ERROR_CORRECT_*, inlined so construction needs no qrcode import
     _ERR_MAP = {
-        "L": ERROR_CORRECT_L,
-        "M": ERROR_CORRECT_M,
-        "Q": ERROR_CORRECT_Q,
-        "H": ERROR_CORRECT_H,
+        "L": 1,
+        "M": 0,
+        "Q": 3,
+        "H": 2,
     }
 
-    def __init__(self, error_level: ErrorLevel = "M", box_size: int = 10, border: int = 4):
+    # Output directories already created this process (skips a stat+mkdir per save)
+    _ENSURED_DIRS: set[str] = set()
+
+    def __init__(self, error_level: ErrorLevel = "M", box_size: int = 10, border: int = 4, fast_png: bool = True):
         if error_level not in self._ERR_MAP:
             raise ValueError("error_level must be one of: L, M, Q, H")
         if box_size < 1 or border < 0:
             raise ValueError("box_size >= 1 and border >= 0 required")
         self.error_level = error_level
+        self._ec_const = self._ERR_MAP[error_level]
         self.box_size = box_size
         self.border = border
+        # fast_png selects cheap DEFLATE settings. Pillow images (GUI saves)
+        # are written at zlib level 1, a little faster than the default level 6
+        # for a ~10% larger file. The zlib writer behind make_png_fast() and
+        # save_png_fast() keeps level 6: at level 1 its files double in size.
+        # fast_png=False selects level 9 for both, for the smallest files.
+        self.png_compress_level = 1 if fast_png else 9
+        self.zlib_png_compress_level = 6 if fast_png else 9
 
     def make_png(self, data: str):
         """Return a Pillow Image for PNG output."""
         if not _PIL_AVAILABLE:
             raise RuntimeError("Pillow is not installed. Install with: pip install pillow")
-        qr = qrcode.QRCode(
-            version=None,
-            error_correction=self._ERR_MAP[self.error_level],
-            box_size=self.box_size,
-            border=self.border,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
+        _lazy_qrcode()
+        qr = self._make_qr(data, image_factory=qr_fast.FastPilImage)
         img = qr.make_image(fill_color="black", back_color="white")  # PilImage
         return img
 
+    def make_png_fast(self, data: str) -> bytes:
+        """Return the PNG file as bytes, encoded directly with zlib (no Pillow)."""
+        _lazy_qrcode()
+        modules = _encode_matrix(data, self._ec_const)
+        return qr_fast.png_bytes(modules, self.box_size, self.border, self.zlib_png_compress_level)
+
+    def save_png_fast(self, data: str, out_path: str) -> str:
+        """Encode data and stream the PNG straight into out_path (no Pillow).
+
+        Unlike make_png_fast() + save(), the file is never assembled in memory,
+        so peak memory stays flat even for large box sizes.
+        """
+        _lazy_qrcode()
+        path = self._resolve_out_path(out_path, b"")
+        modules = _encode_matrix(data, self._ec_const)
+        with _open_output(path) as f:
+            qr_fast.write_png(f, modules, self.box_size, self.border, self.zlib_png_compress_level)
+        return path
+
     def make_svg(self, data: str, method: SvgMethod = "path"):
         """Return a qrcode SVG image object (write with .save(fp))."""
-        if not _SVG_AVAILABLE:
-            raise RuntimeError("qrcode[svg] not installed. Install with: pip install 'qrcode[svg]'")
-        if method == "basic":
-            factory = qsvg.SvgImage
-        elif method == "fragment":
-            factory = qsvg.SvgFragmentImage
-        else:
-            factory = qsvg.SvgPathImage  # best for zoom; no hairline gaps
-        qr = qrcode.QRCode(
-            version=None,
-            error_correction=self._ERR_MAP[self.error_level],
+        _lazy_qrcode()
+        factory = _SVG_FACTORIES.get(method, _SVG_FACTORIES["path"])
+        qr = self._make_qr(data, image_factory=factory)
+        return qr.make_image()
+
+    def _make_qr(self, data: str, image_factory=None) -> qr_fast.FastQRCode:
+        """Return a compiled QRCode for data, ready for make_image()."""
+        return qr_fast.FastQRCode.from_modules(
+            _encode_matrix(data, self._ec_const),
+            error_correction=self._ec_const,
             box_size=self.box_size,
             border=self.border,
-            image_factory=factory,
+            image_factory=image_factory,
         )
-        qr.add_data(data)
-        qr.make(fit=True)
-        return qr.make_image()
+
+    @staticmethod
+    def _segment_data(data: str, version: int = 1) -> list[qrcode.util.QRData]:
+        """Split data into numeric/alphanumeric/byte segments of minimal total size.
+
+        Dynamic program over the bytes of data (ISO/IEC 18004 Annex J): costs
+        are in sixths of a bit so numeric (10 bits / 3 chars) and alphanumeric
+        (11 bits / 2 chars) rates stay integral, and switching mode costs a new
+        segment header for the given version. Expects _lazy_qrcode() to have
+        run, as _encode_matrix() does.
+        """
+        util = qrcode.util
+        raw = util.to_bytestring(data)
+        # One segment is optimal only when no cheaper mode could take a run:
+        # all digits, or alphanumeric with no digits at all.
+        if raw.isdigit() or _ALPHA_NUM_NO_DIGITS.match(raw):
+            return [util.QRData(raw)]
+
+        sizes = util.mode_sizes_for_version(version)
+        modes = (util.MODE_NUMBER, util.MODE_ALPHA_NUM, util.MODE_8BIT_BYTE)
+        head = [(4 + sizes[mode]) * 6 for mode in modes]
+        char_cost = (20, 33, 48)
+        inf = float("inf")
+
+        costs = head[:]
+        # via[i][j]: index of the mode char i is encoded in, if the state after it is mode j
+        via: list[list[Optional[int]]] = []
+        for c in raw:
+            fits = (48 <= c <= 57, c in util.ALPHA_NUM, True)
+            cur = [costs[j] + char_cost[j] if fits[j] else inf for j in range(3)]
+            step: list[Optional[int]] = [j if fits[j] else None for j in range(3)]
+            for j in range(3):
+                for k in range(3):
+                    # Close segment k (rounded up to whole bits) and open j.
+                    if step[k] is None:
+                        continue
+                    switched = -(-cur[k] // 6) * 6 + head[j]
+                    if step[j] is None or switched < cur[j]:
+                        cur[j] = switched
+                        step[j] = k
+            via.append(step)
+            costs = cur
+
+        mode = costs.index(min(costs))
+        chosen = [0] * len(raw)
+        for i in range(len(raw) - 1, -1, -1):
+            mode = via[i][mode]
+            chosen[i] = mode
+
+        segments = []
+        start = 0
+        for i in range(1, len(raw) + 1):
+            if i == len(raw) or chosen[i] != chosen[start]:
+                segments.append(util.QRData(raw[start:i], mode=modes[chosen[start]], check_data=False))
+                start = i
+        return segments
 
     def save(self, obj, out_path: str):
         """Save a generated image object to disk."""
-        ext = os.path.splitext(out_path)[1].lower()
-        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
-
-        # PNG path: Pillow Image
-        if ext in (".png", "") and _PIL_AVAILABLE:
-            obj.save(out_path if ext else out_path + ".png")
+        path = self._resolve_out_path(out_path, obj)
+        _write_file(path, self._serialize(obj))
+        return path
+
+    async def save_async(self, obj, out_path: str):
+        """Like save(), but the blocking disk write runs in a worker thread.
+
+        Serialization happens in memory first, so gathering several of these
+        overlaps encoding of one code with the write-back of the others.
+        """
+        import asyncio  # lazy: costs more to import than a whole encode
+
+        path = self._resolve_out_path(out_path, obj)
+        await asyncio.to_thread(_write_file, path, self._serialize(obj))
+        return path
+
+    @classmethod
+    def _resolve_out_path(cls, out_path: str, obj) -> str:
+        """Return the final output path, creating its directory."""
+        ext = out_path[-4:].lower()
+        if ext not in (".png", ".svg"):
+            ext = os.path.splitext(out_path)[1].lower()
+        dirname = os.path.dirname(out_path) or "."
+        if dirname not in cls._ENSURED_DIRS:
+            os.makedirs(dirname, exist_ok=True)
+            cls._ENSURED_DIRS.add(dirname)
+
+        # PNG path: Pillow Image, or bytes from make_png_fast()
+        if ext in (".png", "") and (_PIL_AVAILABLE or isinstance(obj, bytes)):
             return out_path if ext else out_path + ".png"
 
         # SVG path: qrcode SVG object
         if ext == ".svg":
-            with open(out_path, "wb") as f:
-                obj.save(f)
             return out_path
 
         raise ValueError("Output path must end with .png or .svg (and ensure required deps are installed).")
 
+    def _serialize(self, obj) -> bytes:
+        """Return the bytes of obj's output file.
+
+        The encoder follows the object, not the file name: a qrcode SVG image
+        saved under a .png name is still written as SVG.
+        """
+        if isinstance(obj, bytes):
+            return obj
+        buf = io.BytesIO()
+        if qr_fast.qpil is not None and isinstance(obj, qr_fast.qpil.PilImage):
+            obj.save(buf, format="PNG", optimize=False, compress_level=self.png_compress_level)
+        else:
+            obj.save(buf)
+        return buf.getvalue()
+
+
+# Alphanumeric-mode characters other than the digits (util.ALPHA_NUM minus 0-9)
+_ALPHA_NUM_NO_DIGITS = re.compile(rb"[A-Z $%*+\-./:]*\Z")
+
+
+@functools.lru_cache(maxsize=128)
+def _encode_matrix(data: str, ec_const: int) -> tuple[bytes, ...]:
+    """Compile data into its QR module matrix, one byte (0/1) per module.
+
+    Encoding is deterministic, so repeated inputs (GUI re-generates, duplicate
+    batch lines) are served from this cache; box size and border only matter
+    once the matrix is rendered.
+    """
+    _lazy_qrcode()
+    util = qrcode.util
+    segments = QRCodeGenerator._segment_data(data)
+    version = _fit_version(segments, ec_const)
+    # Segment costs depend on the character-count field width, which grows
+    # at versions 10 and 27: re-segment once for the class actually used.
+    if util.mode_sizes_for_version(version) is not util.MODE_SIZE_SMALL:
+        segments = QRCodeGenerator._segment_data(data, version)
+        version = _fit_version(segments, ec_const)
+
+    # qrcode>=7.4 caches the blank template (finder/timing/alignment
+    # patterns) per version, so a fresh QRCode per call stays cheap.
+    qr = qr_fast.FastQRCode(version=version, error_correction=ec_const)
+    for segment in segments:
+        qr.add_data(segment)
+    qr.make(fit=False)
+    # bytes rows: ~1 byte per module in the cache (~31 KB for version 40)
+    # instead of a list of bool object pointers per row.
+    return tuple(map(bytes, qr.modules))
+
+
+def _fit_version(segments: list[qrcode.util.QRData], ec_const: int) -> int:
+    """Return the smallest version whose capacity holds segments.
+
+    Same search as QRCode.best_fit, but the payload length is computed from
+    segment sizes instead of writing every bit into a BitBuffer first.
+    Called from _encode_matrix(), after _lazy_qrcode().
+    """
+    util = qrcode.util
+    limits = util.BIT_LIMIT_TABLE[ec_const]  # data capacity in bits, by version
+    version = 1
+    while True:
+        sizes = util.mode_sizes_for_version(version)
+        bits = 0
+        for segment in segments:
+            n = len(segment)
+            if segment.mode == util.MODE_NUMBER:
+                bits += 10 * (n // 3) + (0, 4, 7)[n % 3]
+            elif segment.mode == util.MODE_ALPHA_NUM:
+                bits += 11 * (n // 2) + 6 * (n % 2)
+            else:
+                bits += 8 * n
+            bits += 4 + sizes[segment.mode]
+        fit = bisect.bisect_left(limits, bits, version)
+        if fit > 40:
+            raise qrcode.exceptions.DataOverflowError(f"Data too long for a QR code ({bits} bits)")
+        if util.mode_sizes_for_version(fit) is sizes:
+            return fit
+        version = fit
+
+
+def _open_output(path: str):
+    """open(path, "wb"), recreating its directory if it was removed after caching."""
+    try:
+        return open(path, "wb")
+    except FileNotFoundError:
+        dirname = os.path.dirname(path) or "."
+        QRCodeGenerator._ENSURED_DIRS.discard(dirname)
+        os.makedirs(dirname, exist_ok=True)
+        QRCodeGenerator._ENSURED_DIRS.add(dirname)
+        return open(path, "wb")
+
+
+def _write_file(path: str, data):
+    with _open_output(path) as f:
+        f.write(data)
+
 
 # -------------------- Tkinter GUI --------------------
 def run_gui():
     import tkinter as tk
     from tkinter import ttk, filedialog, messagebox
 
+    # Tk bridge for the PNG preview, imported once per GUI session
+    try:
+        from PIL import ImageTk
+    except Exception:
+        ImageTk = None
+
     app = tk.Tk()
     app.title("QR Tool – PNG/SVG")
     app.geometry("640x420")
@@ -169,6 +385,7 @@ def run_gui():
     # Preview (PNG only)
     preview_lbl = ttk.Label(frm, text="(PNG preview appears here after Generate)")
     preview_lbl.grid(row=4, column=0, columnspan=3, sticky="ew", pady=(8, 0))
+    preview_lbl.image = preview_lbl.key = None
 
     def generate():
         data = txt.get("1.0", "end").strip()
@@ -199,15 +416,20 @@ def run_gui():
 
             saved = gen.save(img, out_path)
 
-            # PNG preview
-            if fmt == "png":
-                from PIL import ImageTk  # lazy import
-                tk_img = ImageTk.PhotoImage(file=saved)
-                preview_lbl.configure(image=tk_img, text="")
-                preview_lbl.image = tk_img
+            # PNG preview, built from the in-memory image; identical inputs give
+            # an identical matrix, so the previous PhotoImage is reused as-is.
+            if fmt == "png" and ImageTk is not None:
+                key = (data, gen.error_level, gen.box_size, gen.border)
+                if preview_lbl.key != key:
+                    preview_lbl.image = ImageTk.PhotoImage(img.get_image())
+                    preview_lbl.key = key
+                preview_lbl.configure(image=preview_lbl.image, text="")
+            elif fmt == "png":
+                preview_lbl.configure(text="PNG saved. Preview needs Pillow's Tk support.", image="")
+                preview_lbl.image = preview_lbl.key = None
             else:
                 preview_lbl.configure(text="SVG saved. Open it in your browser/vector app for preview.", image="")
-                preview_lbl.image = None
+                preview_lbl.image = preview_lbl.key = None
 
             messagebox.showinfo("Success", f"QR saved to:\n{saved}")
         except Exception as e:
@@ -224,6 +446,7 @@ def run_gui():
 def build_arg_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(description="Generate QR codes (PNG/SVG) for provisioning.")
     p.add_argument("--data", help="String/URL to encode. If omitted, GUI will start.", default=None)
+    p.add_argument("--data-file", help="Text file with one string/URL per line; --out is then a directory.", default=None)
     p.add_argument("--out", help="Output path (ends with .png or .svg).", default=None)
     p.add_argument("--format", choices=["png", "svg"], default="png")
     p.add_argument("--error", choices=["L", "M", "Q", "H"], default="M")
@@ -237,9 +460,66 @@ def build_arg_parser() -> argparse.ArgumentParser:
     return p
 
 
+_worker_gen: Optional[QRCodeGenerator] = None
+
+
+def _init_worker(error_level: ErrorLevel, box_size: int, border: int):
+    global _worker_gen
+    _worker_gen = QRCodeGenerator(error_level=error_level, box_size=box_size, border=border)
+
+
+def _encode_one(job: tuple[int, str, str, OutFormat, SvgMethod]) -> tuple[int, str, Optional[str]]:
+    """Encode and save one batch line; return (line number, path, error or None)."""
+    lineno, data, out_path, fmt, svg_method = job
+    try:
+        if fmt == "png":
+            return lineno, _worker_gen.save_png_fast(data, out_path), None
+        obj = _worker_gen.make_svg(data, method=svg_method)
+        return lineno, _worker_gen.save(obj, out_path), None
+    except Exception as exc:  # one bad line must not take its chunk down with it
+        return lineno, out_path, f"{type(exc).__name__}: {exc}"
+
+
+def run_batch(args):
+    """Encode every non-empty line of --data-file in a process pool.
+
+    Yields the _encode_one() result of every line, in completion order.
+    """
+    import multiprocessing
+
+    with open(args.data_file, encoding="utf-8") as f:
+        lines = [(n, line.rstrip("\r\n")) for n, line in enumerate(f, 1)]
+    lines = [(n, line) for n, line in lines if line]
+    # Validate options up front rather than once per worker
+    QRCodeGenerator(error_level=args.error, box_size=args.box, border=args.border)
+
+    out_dir = args.out or os.getcwd()
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [
+        (lineno, data, os.path.join(out_dir, f"qr_{i:04d}.{args.format}"), args.format, args.svg_method)
+        for i, (lineno, data) in enumerate(lines, 1)
+    ]
+    with multiprocessing.Pool(initializer=_init_worker, initargs=(args.error, args.box, args.border)) as pool:
+        yield from pool.imap_unordered(_encode_one, jobs, chunksize=32)
+
+
 def main():
     parser = build_arg_parser()
     args = parser.parse_args()
+    if args.data is not None and args.data_file:
+        parser.error("--data and --data-file cannot be used together")
+
+    if args.data_file and not args.gui:
+        failed = 0
+        for lineno, saved, error in run_batch(args):
+            if error is not None:
+                failed += 1
+                print(f"ERROR line {lineno}: {error}", file=sys.stderr)
+            elif not args.quiet:
+                print(f"Saved: {saved}")
+        if failed:
+            sys.exit(1)
+        return
 
     # Launch GUI if requested or if no data provided
     if args.gui or args.data is None:
@@ -249,16 +529,11 @@ def main():
     gen = QRCodeGenerator(error_level=args.error, box_size=args.box, border=args.border)
     data = args.data
 
+    out = args.out or (os.path.join(os.getcwd(), f"qr_output.{args.format}"))
     if args.format == "png":
-        if not _PIL_AVAILABLE:
-            print("ERROR: Pillow is required for PNG. Install with: pip install pillow", file=sys.stderr)
-            sys.exit(2)
-        obj = gen.make_png(data)
+        saved = gen.save_png_fast(data, out)  # no Pillow needed
     else:
-        obj = gen.make_svg(data, method=args.svg_method)
-
-    out = args.out or (os.path.join(os.getcwd(), f"qr_output.{args.format}"))
-    saved = gen.save(obj, out)
+        saved = gen.save(gen.make_svg(data, method=args.svg_method), out)
 
     if not args.quiet:
         print(f"Saved: {saved}")
@@ -0,0 +1,398 @@
+"""Fast encoders and image factories used by app.QRCodeGenerator."""
+from __future__ import annotations
+import functools
+import io
+import itertools
+import operator
+import re
+import struct
+import zlib
+from decimal import Decimal
+
+import qrcode
+import qrcode.image.svg as qsvg
+import qrcode.util
+
+# Pillow is optional here too (make_png_fast needs none)
+try:
+    import qrcode.image.pil as qpil
+    from PIL import Image
+except ImportError:
+    qpil = None
+
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+
+_PNG_IEND = _png_chunk(b"IEND", b"")
+
+
+def iter_rows(modules, box_size: int, border: int):
+    """Yield (packed_row, repeat) pairs for the 1-bit pixel rows of a QR matrix.
+
+    Rows are 1 = white, MSB first. Each module row is turned into a '0'/'1'
+    string and packed with int(..., 2), so the per-pixel work happens in C
+    rather than in a Python loop.
+    """
+    width = (len(modules) + 2 * border) * box_size
+    pad = -width % 8
+    nbytes = (width + pad) // 8
+    light = "1" * box_size
+    spans = (light, "0" * box_size)  # indexed by module value
+    edge = light * border
+    tail = "0" * pad
+
+    blank = b"\xff" * nbytes
+    if border:
+        yield blank, border * box_size
+    for row in modules:
+        bits = edge + "".join(map(spans.__getitem__, row)) + edge + tail
+        yield int(bits, 2).to_bytes(nbytes, "big"), box_size
+    if border:
+        yield blank, border * box_size
+
+
+def pack_rows(modules, box_size: int, border: int) -> list[bytes]:
+    """Return the 1-bit pixel rows (1 = white, MSB first) of a QR matrix."""
+    rows = []
+    for row, repeat in iter_rows(modules, box_size, border):
+        rows.extend([row] * repeat)
+    return rows
+
+
+def write_png(fp, modules, box_size: int, border: int, compress_level: int = -1):
+    """Write a QR matrix to the binary stream fp as a 1-bit grayscale PNG file.
+
+    Scanlines are compressed one module row at a time and every piece zlib
+    hands back goes straight out as its own IDAT chunk, so neither the raw
+    image nor the whole compressed stream is ever held in memory.
+    """
+    size = (len(modules) + 2 * border) * box_size
+    ihdr = struct.pack(">IIBBBBB", size, size, 1, 0, 0, 0, 0)
+    fp.write(_PNG_SIGNATURE + _png_chunk(b"IHDR", ihdr))
+    z = zlib.compressobj(compress_level)
+    up = b""
+    for row, repeat in iter_rows(modules, box_size, border):
+        # First scanline of a row unfiltered (type 0); the repeats use filter
+        # type 2 (Up) and so are all zero bytes, which deflate packs to nothing.
+        if len(up) != len(row) + 1:
+            up = b"\x02" + bytes(len(row))
+        out = z.compress(b"\x00" + row + up * (repeat - 1))
+        if out:
+            fp.write(_png_chunk(b"IDAT", out))
+    fp.write(_png_chunk(b"IDAT", z.flush()) + _PNG_IEND)
+
+
+def png_bytes(modules, box_size: int, border: int, compress_level: int = -1) -> bytes:
+    """Encode a QR matrix as a 1-bit grayscale PNG file."""
+    buf = io.BytesIO()
+    write_png(buf, modules, box_size, border, compress_level)
+    return buf.getvalue()
+
+
+if qpil is not None:
+
+    class FastPilImage(qpil.PilImage):
+        """PilImage that fills black-on-white codes with one Image.frombytes call."""
+
+        needs_drawrect = False
+
+        def new_image(self, **kwargs):
+            colors = (kwargs.get("fill_color", "black"), kwargs.get("back_color", "white"))
+            if tuple(str(c).lower() for c in colors) != ("black", "white"):
+                # Other palettes keep qrcode's per-module rectangle drawing.
+                self.needs_drawrect = True
+                return super().new_image(**kwargs)
+            rows = pack_rows(self.modules, self.box_size, self.border)
+            return Image.frombytes("1", (self.pixel_size, self.pixel_size), b"".join(rows))
+
+
+_DARK_RUN = re.compile(rb"\x01+")
+
+
+def svg_path_d(modules, box_size: int, border: int) -> str:
+    """Return SVG path data covering the dark modules as a set of rectangles.
+
+    Coordinates use the same units as qrcode's SVG images (box_size 10 = 1mm).
+    Runs are found by a regex over each row's bytes instead of per module, and
+    a run repeated on the following rows is extended downwards rather than
+    emitted again, so dense codes need far fewer subpaths.
+    """
+    count = len(modules) + 2 * border
+    units = [str(Decimal(i * box_size) / 10) for i in range(count + 1)]
+    parts = []
+    # (start, end) column span -> first row of the rectangle still open below it
+    open_spans: dict[tuple[int, int], int] = {}
+
+    def close(span, top, bottom):
+        x0, x1 = units[span[0] + border], units[span[1] + border]
+        parts.append(f"M{x0},{units[top + border]}H{x1}V{units[bottom + border]}H{x0}z")
+
+    for y, row in enumerate(modules):
+        spans = {run.span(): y for run in _DARK_RUN.finditer(bytes(row))}
+        for span, top in open_spans.items():
+            if span in spans:
+                spans[span] = top
+            else:
+                close(span, top, y)
+        open_spans = spans
+    for span, top in open_spans.items():
+        close(span, top, len(modules))
+    return "".join(parts)
+
+
+_XML_DECLARATION = "<?xml version='1.0' encoding='UTF-8'?>\n"
+_SVG_ELEMENT = (
+    '<svg width="{size}" height="{size}" version="1.1" viewBox="0 0 {view} {view}" xmlns="http://www.w3.org/2000/svg">'
+    '<path d="{d}" id="qr-path" fill="#000000" fill-opacity="1" fill-rule="nonzero" stroke="none" /></svg>'
+)
+
+
+class FastSvgPathImage(qsvg.SvgPathImage):
+    """SvgPathImage that builds its path from module runs instead of per-module drawing.
+
+    The document is a fixed <svg><path/></svg> pair, so save() and to_string()
+    format it from a template instead of going through ElementTree; the
+    element tree behind get_image() is only built if asked for. The markup
+    matches SvgPathImage's.
+    """
+
+    needs_drawrect = False
+    path_data = ""
+
+    def new_image(self, **kwargs):
+        return None
+
+    def process(self):
+        self.path_data = svg_path_d(self.modules, self.box_size, self.border)
+
+    def get_image(self, **kwargs):
+        """Return the <svg> element, built on first use."""
+        if self._img is None:
+            self._img = self._svg()
+            self.path = qsvg.ET.Element(
+                qsvg.ET.QName("path"), d=self.path_data, id="qr-path", **self.QR_PATH_STYLE
+            )
+            self._img.append(self.path)
+        return self._img
+
+    def _element(self) -> str:
+        return _SVG_ELEMENT.format(
+            size=self.units(self.pixel_size),
+            view=self.units(self.pixel_size, text=False),
+            d=self.path_data,
+        )
+
+    def to_string(self, **kwargs):
+        """Same result as ET.tostring() of the <svg> element, as in SvgPathImage."""
+        if not kwargs:
+            return self._element().encode("ascii")
+        if kwargs == {"encoding": "unicode"}:
+            return self._element()
+        return qsvg.ET.tostring(self.get_image(), **kwargs)
+
+    def save(self, stream, kind=None):
+        self.check_kind(kind=kind)
+        stream.write((_XML_DECLARATION + self._element()).encode("ascii"))
+
+
+# Mask penalty rules (ISO/IEC 18004 7.8.3) on rows/columns as bytes of 0/1.
+_SAME_RUN = re.compile(rb"\x00{5,}|\x01{5,}")
+_FINDER_LIKE = re.compile(rb"(?=\x01\x00\x01\x01\x01\x00\x01\x00\x00\x00\x00|\x00\x00\x00\x00\x01\x00\x01\x01\x01\x00\x01)")
+_BITS = bytes.maketrans(b"\x00\x01", b"01")
+
+
+def lost_point(modules) -> int:
+    """Same score as qrcode.util.lost_point, with the scans done by re and int ops."""
+    count = len(modules)
+    rows = [bytes(row) for row in modules]
+    # All rows and columns in one buffer; the \x02 separator stops runs and
+    # patterns from spanning two lines, so each rule is a single regex pass.
+    lines = b"\x02".join(rows + [bytes(col) for col in zip(*modules)])
+
+    # Rule 1: runs of 5+ same-colored modules.
+    runs = _SAME_RUN.findall(lines)
+    lost = sum(map(len, runs)) - 2 * len(runs)
+
+    # Rule 2: 2x2 same-colored blocks, a whole row pair per step as int bit masks.
+    ints = [int(row.translate(_BITS), 2) for row in rows]
+    pair_mask = (1 << (count - 1)) - 1
+    blocks = 0
+    for top, bottom in zip(ints, ints[1:]):
+        vertical = ~(top ^ bottom)
+        blocks += bin(vertical & (vertical >> 1) & ~(top ^ (top >> 1)) & pair_mask).count("1")
+    lost += 3 * blocks
+
+    # Rule 3: 1:1:3:1:1 finder-like patterns next to 4 light modules.
+    lost += 40 * len(_FINDER_LIKE.findall(lines))
+
+    # Rule 4: dark/light balance, every 5% away from 50%.
+    dark = sum(row.count(1) for row in rows)
+    percent = float(dark) / (count**2)
+    return lost + int(abs(percent * 100 - 50) / 5) * 10
+
+
+_DARK = {"0": False, "1": True}
+# version -> (data module coordinates in placement order, per-row itemgetters)
+_PLACEMENTS: dict[int, tuple[list[tuple[int, int]], list[operator.itemgetter]]] = {}
+
+
+def _placement(version: int, modules):
+    """Return where data bits go for version, derived once from its unset modules.
+
+    The getter for row r picks each module either from the flattened matrix
+    (function patterns, format info) or from the data bits appended after it.
+    """
+    try:
+        return _PLACEMENTS[version]
+    except KeyError:
+        pass
+    count = len(modules)
+    coords = []
+    row, inc = count - 1, -1
+    # Two-module-wide columns zig-zagging up and down from the bottom right,
+    # skipping the vertical timing pattern (same walk as QRCode.map_data).
+    for col in range(count - 1, 0, -2):
+        if col <= 6:
+            col -= 1
+        while 0 <= row < count:
+            for c in (col, col - 1):
+                if modules[row][c] is None:
+                    coords.append((row, c))
+            row += inc
+        row -= inc
+        inc = -inc
+    index = [[r * count + c for c in range(count)] for r in range(count)]
+    for i, (r, c) in enumerate(coords, count * count):
+        index[r][c] = i
+    _PLACEMENTS[version] = coords, [operator.itemgetter(*row) for row in index]
+    return _PLACEMENTS[version]
+
+
+@functools.lru_cache(maxsize=None)
+def _mask_bits(version: int, mask_pattern: int) -> int:
+    """Return mask_pattern over version's data modules, in placement order, as an int."""
+    coords = _PLACEMENTS[version][0]
+    mask = qrcode.util.mask_func(mask_pattern)
+    return int("".join(["1" if mask(r, c) else "0" for r, c in coords]), 2)
+
+
+class FastQRCode(qrcode.QRCode):
+    """QRCode with table-driven data placement and the mask scorer above."""
+
+    @classmethod
+    def from_modules(cls, modules, **kwargs) -> FastQRCode:
+        """Return an already-compiled QRCode around an existing module matrix."""
+        qr = cls(**kwargs)
+        qr.version = (len(modules) - 17) // 4
+        qr.modules = [list(row) for row in modules]
+        qr.modules_count = len(modules)
+        qr.data_cache = []  # non-None: make_image() must not recompile
+        return qr
+
+    def map_data(self, data, mask_pattern):
+        """Place the codewords with one C-level gather per row (see _placement)."""
+        coords, row_getters = _placement(self.version, self.modules)
+        count = len(coords)
+        mask = _mask_bits(self.version, mask_pattern)
+        value = int.from_bytes(bytes(data), "big") << (count - 8 * len(data))
+        # Flat source for the gathers: every current module, then the data bits.
+        flat = list(itertools.chain.from_iterable(self.modules))
+        flat.extend(map(_DARK.__getitem__, format(value ^ mask, f"0{count}b")))
+        self.modules = [list(get(flat)) for get in row_getters]
+
+    def best_mask_pattern(self):
+        scores = []
+        for i in range(8):
+            self.makeImpl(True, i)
+            scores.append(lost_point(self.modules))
+        return scores.index(min(scores))
+
+
+# GF(256) antilog/log tables for the QR polynomial 0x11D. The antilog table is
+# doubled so log sums index it directly without a % 255.
+def _gf_tables() -> tuple[bytes, bytes]:
+    exp = bytearray(510)
+    log = bytearray(256)
+    x = 1
+    for i in range(255):
+        exp[i] = exp[i + 255] = x
+        log[x] = i
+        x <<= 1
+        if x & 0x100:
+            x ^= 0x11D
+    return bytes(exp), bytes(log)
+
+
+_GF_EXP, _GF_LOG = _gf_tables()
+
+
+@functools.lru_cache(maxsize=None)
+def _rs_generator_log(ec_count: int) -> tuple[int, ...]:
+    """Return the logs of the generator polynomial coefficients after the leading 1."""
+    gen = [1]
+    for i in range(ec_count):
+        # gen *= (x - a^i); every product term is a lookup in the tables.
+        nxt = gen + [0]
+        for j, coef in enumerate(gen, 1):
+            if coef:
+                nxt[j] ^= _GF_EXP[_GF_LOG[coef] + i]
+        gen = nxt
+    return tuple(_GF_LOG[coef] for coef in gen[1:])
+
+
+@functools.lru_cache(maxsize=None)
+def _rs_generator_products(ec_count: int) -> tuple[int, ...]:
+    """Return, for every byte c, the generator coefficients (after the 1) times c.
+
+    Each row is packed big-endian into one int, so the division step is a
+    single shift and XOR of ec_count bytes at once, with no log/antilog
+    lookups in the loop.
+    """
+    gen_log = _rs_generator_log(ec_count)
+    rows = [0]
+    for c in range(1, 256):
+        lc = _GF_LOG[c]
+        rows.append(int.from_bytes(bytes(_GF_EXP[lc + g] for g in gen_log), "big"))
+    return tuple(rows)
+
+
+def rs_remainder(data: list[int], ec_count: int) -> list[int]:
+    """Return the ec_count Reed-Solomon error-correction codewords for data."""
+    products = _rs_generator_products(ec_count)
+    shift = 8 * (ec_count - 1)
+    mask = (1 << (8 * ec_count)) - 1
+    # Shift-register form of the long division, the whole register in one int.
+    rem = 0
+    for b in data:
+        rem = ((rem << 8) & mask) ^ products[b ^ (rem >> shift)]
+    return list(rem.to_bytes(ec_count, "big"))
+
+
+def create_bytes(buffer, rs_blocks) -> list[int]:
+    """Drop-in for qrcode.util.create_bytes using rs_remainder."""
+    offset = 0
+    dcdata: list[list[int]] = []
+    ecdata: list[list[int]] = []
+    for rs_block in rs_blocks:
+        dc_count = rs_block.data_count
+        current_dc = [0xFF & b for b in buffer.buffer[offset:offset + dc_count]]
+        offset += dc_count
+        dcdata.append(current_dc)
+        ecdata.append(rs_remainder(current_dc, rs_block.total_count - dc_count))
+
+    # Interleave codewords block by block, as qrcode does.
+    data = []
+    for blocks in (dcdata, ecdata):
+        for i in range(max(map(len, blocks))):
+            data.extend(block[i] for block in blocks if i < len(block))
+    return data
+
+
+def install():
+    """Route qrcode's Reed-Solomon step through the table-driven encoder."""
+    qrcode.util.create_bytes = create_bytes
@@ -0,0 +1,125 @@
+"""Checks for app.QRCodeGenerator encoding and saving (python -m unittest)."""
+import asyncio
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import qrcode
+
+import app
+
+EC_LEVELS = ("L", "M", "Q", "H")
+
+
+def setUpModule():
+    app._lazy_qrcode()  # _segment_data() is called directly below
+
+
+def _stock_version(data: str, ec_const: int) -> int:
+    qr = qrcode.QRCode(error_correction=ec_const)
+    qr.add_data(data)
+    return qr.best_fit()
+
+
+def _mixed(rng: random.Random) -> str:
+    """Random text built from runs of digits, uppercase, alphanumeric symbols and bytes."""
+    pools = ("0123456789", "ABCDEFGHIJKLMNOPQRSTUVWXYZ", " $%*+-./:", "abcxyz@?&=_", "é€")
+    runs = []
+    for pool in rng.choices(pools, k=rng.randint(1, 8)):
+        runs.append("".join(rng.choice(pool) for _ in range(rng.randint(1, 40))))
+    return "".join(runs)
+
+
+class VersionTest(unittest.TestCase):
+    def assertNotLargerThanStock(self, data: str):
+        for level in EC_LEVELS:
+            gen = app.QRCodeGenerator(error_level=level)
+            modules = app._encode_matrix(data, gen._ec_const)
+            with self.subTest(data=data, level=level):
+                self.assertLessEqual((len(modules) - 17) // 4, _stock_version(data, gen._ec_const))
+
+    def test_single_mode_data(self):
+        for data in ("12345", "0" * 300, "HELLO WORLD", "A" * 200, "hello", ""):
+            self.assertNotLargerThanStock(data)
+
+    def test_alphanumeric_with_digit_runs(self):
+        for data in ("WIFI:" + "0" * 90, "HTTP://EX.CO/" + "1234567890" * 6, "ID 7 " + "9" * 40 + " END"):
+            self.assertNotLargerThanStock(data)
+
+    def test_random_mixed_data(self):
+        rng = random.Random(5)
+        for _ in range(60):
+            data = _mixed(rng)
+            self.assertNotLargerThanStock(data)
+            for version in (1, 10, 27):  # one per character-count width class
+                segments = app.QRCodeGenerator._segment_data(data, version)
+                self.assertEqual(b"".join(s.data for s in segments), data.encode())
+
+
+class SaveTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.gen = app.QRCodeGenerator()
+
+    def read(self, path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    def test_svg_saved_under_png_name_stays_svg(self):
+        for method in ("path", "basic", "fragment"):
+            with self.subTest(method=method):
+                path = self.gen.save(self.gen.make_svg("hello", method=method), os.path.join(self.dir, f"{method}.png"))
+                self.assertIn(b"<svg", self.read(path)[:200])
+
+    def test_output_dir_recreated_after_removal(self):
+        out_dir = os.path.join(self.dir, "out")
+        for _ in range(2):
+            path = self.gen.save(self.gen.make_svg("hello"), os.path.join(out_dir, "a.svg"))
+            self.assertTrue(os.path.isfile(path))
+            shutil.rmtree(out_dir)  # the directory stays in _ENSURED_DIRS
+            path = self.gen.save_png_fast("hello", os.path.join(out_dir, "a.png"))
+            self.assertTrue(os.path.isfile(path))
+            shutil.rmtree(out_dir)
+
+    def test_save_async_gathered(self):
+        names = [os.path.join(self.dir, f"{i}.svg") for i in range(4)]
+
+        async def save_all():
+            return await asyncio.gather(*(self.gen.save_async(self.gen.make_svg(f"code {i}"), name)
+                                          for i, name in enumerate(names)))
+
+        self.assertEqual(asyncio.run(save_all()), names)
+        for i, name in enumerate(names):
+            expected = self.gen.save(self.gen.make_svg(f"code {i}"), os.path.join(self.dir, "sync.svg"))
+            self.assertEqual(self.read(name), self.read(expected))
+
+
+class BatchTest(unittest.TestCase):
+    def run_app(self, *args: str) -> subprocess.CompletedProcess:
+        return subprocess.run([sys.executable, app.__file__, *args], capture_output=True, text=True)
+
+    def test_bad_line_reported_and_others_written(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data_file = os.path.join(tmp, "lines.txt")
+            with open(data_file, "w", encoding="utf-8") as f:
+                f.write("first\n" + "X" * 4000 + "\n\nlast\n")
+            out_dir = os.path.join(tmp, "out")
+            result = self.run_app("--data-file", data_file, "--out", out_dir, "--quiet")
+            self.assertEqual(result.returncode, 1)
+            self.assertIn("ERROR line 2: DataOverflowError", result.stderr)
+            self.assertEqual(sorted(os.listdir(out_dir)), ["qr_0001.png", "qr_0003.png"])
+
+    def test_data_and_data_file_rejected(self):
+        result = self.run_app("--data", "x", "--data-file", "lines.txt")
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("--data-file", result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
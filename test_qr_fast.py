@@ -0,0 +1,200 @@
+"""Check the qr_fast replacements against stock qrcode (python -m unittest)."""
+import io
+import random
+import re
+import unittest
+from fractions import Fraction
+from unittest import mock
+
+import qrcode
+import qrcode.base
+import qrcode.image.svg
+import qrcode.util
+from qrcode.compat.etree import ET
+
+import qr_fast
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Captured before anything can run qr_fast.install()
+STOCK_CREATE_BYTES = qrcode.util.create_bytes
+STOCK_LOST_POINT = qrcode.util.lost_point
+
+VERSIONS = range(1, 41)
+EC_LEVELS = (
+    qrcode.constants.ERROR_CORRECT_L,
+    qrcode.constants.ERROR_CORRECT_M,
+    qrcode.constants.ERROR_CORRECT_Q,
+    qrcode.constants.ERROR_CORRECT_H,
+)
+
+
+def _payload(rng: random.Random, version: int, ec: int) -> bytes:
+    """Random 8-bit data filling the version's capacity at level ec."""
+    header = 4 + qrcode.util.length_in_bits(qrcode.util.MODE_8BIT_BYTE, version)
+    count = (qrcode.util.BIT_LIMIT_TABLE[ec][version] - header) // 8
+    return bytes(rng.randrange(256) for _ in range(count))
+
+
+def _stock_qr(data: bytes, version: int, ec: int, mask_pattern=None):
+    qr = qrcode.QRCode(version=version, error_correction=ec, mask_pattern=mask_pattern)
+    qr.add_data(data, optimize=0)
+    with mock.patch.object(qrcode.util, "create_bytes", STOCK_CREATE_BYTES), \
+            mock.patch.object(qrcode.util, "lost_point", STOCK_LOST_POINT):
+        qr.make(fit=False)
+    return qr
+
+
+def _fast_qr(data: bytes, version: int, ec: int, mask_pattern=None):
+    qr = qr_fast.FastQRCode(version=version, error_correction=ec, mask_pattern=mask_pattern)
+    qr.add_data(data, optimize=0)
+    with mock.patch.object(qrcode.util, "create_bytes", qr_fast.create_bytes):
+        qr.make(fit=False)
+    return qr
+
+
+class CreateBytesTest(unittest.TestCase):
+    def test_matches_stock(self):
+        rng = random.Random(1)
+        for version in VERSIONS:
+            for ec in EC_LEVELS:
+                blocks = qrcode.base.rs_blocks(version, ec)
+                buffer = qrcode.util.BitBuffer()
+                buffer.buffer = [rng.randrange(256) for _ in range(sum(b.data_count for b in blocks))]
+                buffer.buffer[0] = 0  # a leading zero coefficient is a distinct path
+                with self.subTest(version=version, ec=ec):
+                    self.assertEqual(qr_fast.create_bytes(buffer, blocks), STOCK_CREATE_BYTES(buffer, blocks))
+
+
+class InstallTest(unittest.TestCase):
+    def test_patches_create_bytes(self):
+        with mock.patch.object(qrcode.util, "create_bytes", STOCK_CREATE_BYTES):
+            qr_fast.install()
+            self.assertIs(qrcode.util.create_bytes, qr_fast.create_bytes)
+
+
+class LostPointTest(unittest.TestCase):
+    def test_matches_stock(self):
+        rng = random.Random(2)
+        for version in VERSIONS:
+            qr = _stock_qr(_payload(rng, version, 0), version, 0, mask_pattern=version % 8)
+            with self.subTest(version=version):
+                self.assertEqual(qr_fast.lost_point(qr.modules), STOCK_LOST_POINT(qr.modules))
+
+
+class MatrixTest(unittest.TestCase):
+    def test_fixed_mask_matches_stock(self):
+        rng = random.Random(3)
+        for version in VERSIONS:
+            for ec in EC_LEVELS:
+                data = _payload(rng, version, ec)
+                mask = (version + ec) % 8
+                with self.subTest(version=version, ec=ec):
+                    self.assertEqual(
+                        _fast_qr(data, version, ec, mask).modules,
+                        _stock_qr(data, version, ec, mask).modules,
+                    )
+
+    def test_best_mask_matches_stock(self):
+        # Stock mask selection is slow; cycle through the levels across versions.
+        rng = random.Random(4)
+        for version in VERSIONS:
+            ec = EC_LEVELS[version % 4]
+            data = _payload(rng, version, ec)
+            with self.subTest(version=version, ec=ec):
+                self.assertEqual(_fast_qr(data, version, ec).modules, _stock_qr(data, version, ec).modules)
+
+
+_RECT = re.compile(r"M([\d.]+),([\d.]+)H([\d.]+)V([\d.]+)H([\d.]+)z")
+
+
+class SvgPathTest(unittest.TestCase):
+    def cover_counts(self, d: str, count: int, box_size: int) -> list[list[int]]:
+        """How many path rectangles cover each module cell, border included."""
+        grid = [[0] * count for _ in range(count)]
+        scale = Fraction(10, box_size)  # path units are box_size/10 per module
+        consumed = 0
+        for match in _RECT.finditer(d):
+            self.assertEqual(match.start(), consumed, "unparsed path data")
+            consumed = match.end()
+            x0, y0, x1, y1, back = (Fraction(v) * scale for v in match.groups())
+            self.assertEqual(back, x0)
+            for value in (x0, y0, x1, y1):
+                self.assertEqual(value.denominator, 1, "rectangle off the module grid")
+            self.assertTrue(x0 < x1 and y0 < y1)
+            for y in range(int(y0), int(y1)):
+                for x in range(int(x0), int(x1)):
+                    grid[y][x] += 1
+        self.assertEqual(consumed, len(d))
+        return grid
+
+    def test_rectangles_cover_dark_modules_once(self):
+        rng = random.Random(6)
+        for version in (1, 7, 25):
+            modules = _stock_qr(_payload(rng, version, 1), version, 1, mask_pattern=3).modules
+            for box_size in (1, 3, 10, 25):
+                for border in (0, 1, 4):
+                    count = len(modules) + 2 * border
+                    expected = [[0] * count for _ in range(count)]
+                    for y, row in enumerate(modules):
+                        for x, dark in enumerate(row):
+                            expected[y + border][x + border] = int(dark)
+                    d = qr_fast.svg_path_d(modules, box_size, border)
+                    with self.subTest(version=version, box_size=box_size, border=border):
+                        self.assertEqual(self.cover_counts(d, count, box_size), expected)
+
+
+class FastSvgPathImageTest(unittest.TestCase):
+    def setUp(self):
+        qr = _stock_qr(b"https://example.com/", 2, 0, mask_pattern=1)
+        qr.box_size, qr.border = 7, 2
+        self.stock = qr.make_image(image_factory=qrcode.image.svg.SvgPathImage)
+        qr = qr_fast.FastQRCode.from_modules(qr.modules, box_size=7, border=2)
+        self.fast = qr.make_image(image_factory=qr_fast.FastSvgPathImage)
+
+    def stock_markup(self, markup):
+        """Stock output with the fast path data in place of the per-module one."""
+        d = self.stock.path.get("d")
+        if isinstance(markup, str):
+            return markup.replace(d, self.fast.path_data)
+        return markup.replace(d.encode(), self.fast.path_data.encode())
+
+    def test_to_string_matches_stock(self):
+        for kwargs in ({}, {"encoding": "unicode"}, {"encoding": "UTF-8"}, {"xml_declaration": True}):
+            with self.subTest(**kwargs):
+                self.assertEqual(self.fast.to_string(**kwargs), self.stock_markup(self.stock.to_string(**kwargs)))
+
+    def test_save_matches_stock(self):
+        fast, stock = io.BytesIO(), io.BytesIO()
+        self.fast.save(fast)
+        self.stock.save(stock)
+        self.assertEqual(fast.getvalue(), self.stock_markup(stock.getvalue()))
+
+    def test_get_image_is_the_svg_element(self):
+        self.assertEqual(ET.tostring(self.fast.get_image()), self.fast.to_string())
+
+
+@unittest.skipIf(Image is None, "Pillow is not installed")
+class PngTest(unittest.TestCase):
+    def test_pixels_match_stock_pil_image(self):
+        rng = random.Random(7)
+        for version in (1, 6):
+            qr = _stock_qr(_payload(rng, version, 2), version, 2, mask_pattern=5)
+            for box_size in range(1, 11):
+                for border in (0, 1, 4):
+                    qr.box_size, qr.border = box_size, border
+                    stock = qr.make_image().get_image().convert("L")
+                    for level in (1, 6):
+                        png = qr_fast.png_bytes(qr.modules, box_size, border, level)
+                        with self.subTest(version=version, box_size=box_size, border=border, level=level):
+                            fast = Image.open(io.BytesIO(png))
+                            self.assertEqual(fast.mode, "1")
+                            self.assertEqual(fast.size, stock.size)
+                            self.assertEqual(fast.convert("L").tobytes(), stock.tobytes())
+
+
+if __name__ == "__main__":
+    unittest.main()